@@ -11,13 +11,16 @@
 
 import subprocess
 import os
+import hashlib
+import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # File paths
 VIDEO_FILE = "metronomes_sync_46s_lock40_pastel_spatial_phase.mp4"
 AUDIO_FILE = "synchronized_hearts.wav"
-TEMP_VIDEO_WITH_AUDIO = "temp_video_with_audio.mp4"
 
 # Language settings
 LANGUAGE = "en"  # "en" for English, "pt" for Portuguese
@@ -30,9 +33,42 @@ VIDEO_FPS = 30
 
 # Intro/Outro timing
 INTRO_DURATION = 4.0    # seconds
+MAIN_DURATION = 46.0    # seconds - DURATION_S of the video rendered by main.py
 PAUSE_DURATION = 2.0    # seconds - hold last frame
 OUTRO_DURATION = 8.0    # seconds (more time for credits since video is shorter)
 
+# Segment encoding - must match the main video (imageio/libx264 output) so
+# the final concat can stream-copy it; GOP aligned to the cut points.
+# veryfast (not ultrafast) keeps CABAC/8x8dct so the streams stay spliceable.
+# The three segments encode concurrently, so each gets a third of the cores.
+# Filters end in setsar=0: imageio writes no SAR, and a 1:1 SAR would add
+# aspect_ratio_info to the SPS VUI.
+# Keep in sync with VIDEO_QUALITY / VIDEO_PRESET in main.py. imageio maps
+# quality=8 to x264 crf int((1 - 8/10) * 51) = 10; the crf sets the PPS
+# pic_init_qp, so it must match.
+MAIN_VIDEO_QUALITY = 8
+MAIN_VIDEO_PRESET = "veryfast"
+SEGMENT_CRF = int((1 - MAIN_VIDEO_QUALITY / 10.0) * 51)
+SEGMENT_ENCODE_ARGS = [
+    "-c:v", "libx264",
+    "-preset", MAIN_VIDEO_PRESET,
+    "-crf", str(SEGMENT_CRF),
+    "-tune", "stillimage",
+    "-profile:v", "high",
+    "-pix_fmt", "yuv420p",
+    "-r", str(VIDEO_FPS),
+    "-video_track_timescale", "15360",
+    "-g", str(VIDEO_FPS),
+    "-x264-params", f"keyint={VIDEO_FPS}:min-keyint={VIDEO_FPS}:scenecut=0",
+]
+# Kept out of SEGMENT_ENCODE_ARGS: it doesn't change the output, so it must
+# not change the segment cache key either
+SEGMENT_THREAD_ARGS = ["-threads", str(max(1, (os.cpu_count() or 3) // 3))]
+
+# Rendered intro/pause/outro are reused across runs (keyed by their filters
+# and encode args)
+SEGMENT_CACHE_DIR = Path.home() / ".cache" / "kuramoto"
+
 # Colors (matching your video's palette)
 BG_COLOR = "0a0e16"     # Dark navy (hex)
 TEXT_COLOR = "ecf6ff"   # Light text
@@ -63,8 +99,22 @@ TEXTS = {
 # Get current language texts
 CURRENT_TEXTS = TEXTS[LANGUAGE]
 
+# Title card layouts - one drawtext per line, keyed into CURRENT_TEXTS
+FONT_FILE = "/System/Library/Fonts/Helvetica.ttc"
+INTRO_LINES = [
+    {"text": "intro_title",    "fontsize": 64, "color": TEXT_COLOR,   "y": "h/2-100", "fade_in": 0.5},
+    {"text": "intro_subtitle", "fontsize": 28, "color": ACCENT_COLOR, "y": "h/2-20",  "fade_in": 1.0},
+    {"text": "intro_credit",   "fontsize": 20, "color": TEXT_COLOR,   "y": "h/2+60",  "fade_in": 2.0},
+]
+OUTRO_LINES = [
+    {"text": "outro_title",    "fontsize": 48, "color": TEXT_COLOR,   "y": "h/2-100", "fade_in": 0.5},
+    {"text": "outro_subtitle", "fontsize": 24, "color": ACCENT_COLOR, "y": "h/2-30",  "fade_in": 1.0},
+    {"text": "outro_footer",   "fontsize": 16, "color": TEXT_COLOR,   "y": "h/2+40",  "fade_in": 2.0},
+    {"text": "outro_github",   "fontsize": 18, "color": ACCENT_COLOR, "y": "h/2+80",  "fade_in": 3.0},
+]
+TEXT_FADE_DURATION = 0.5   # seconds for each line to fade in
+
 # Audio settings
-SAMPLE_RATE = 44100        # For audio looping calculations
 AUDIO_FADE_IN = 2.0        # seconds
 AUDIO_FADE_OUT = 3.0       # seconds
 AUDIO_VOLUME = 0.7         # 0.0 to 1.0 (70% volume for ambient feel)
@@ -103,112 +153,307 @@ def check_input_files():
     if audio_exists:
         print(f"  ✅ Audio found: {AUDIO_FILE}")
     else:
-        print(f"  ❌ Audio missing: {AUDIO_FILE}")
-        print("     Run generate_music.py first to create the music")
+        print(f"  ⚠️  Audio missing: {AUDIO_FILE}")
+        print("     The music will be synthesized in-process and piped to FFmpeg")
     
-    return video_exists and audio_exists
+    return video_exists
+
+def synthesize_music():
+    """Generate the soundtrack in memory (no WAV round-trip)"""
+    import generate_harmonic_music as music
+    return music.generate_synchronized_hearts(), music.SAMPLE_RATE
 
-def get_video_duration():
-    """Get video duration using ffprobe"""
+def run_ffmpeg(cmd, timeout, input_bytes=None, duration=None):
+    """Run an FFmpeg command with terse logging
+    
+    Only errors are collected from stderr. When duration is given, progress
+    is streamed from -progress output so long encodes report (and hangs
+    hit the timeout) as they run. Returns a CompletedProcess with text stderr.
+    """
+    # -nostdin: several FFmpegs run at once, and each would otherwise grab
+    # the terminal for its key handling and race to restore termios
+    cmd = [cmd[0], "-nostdin", "-nostats", "-loglevel", "error", *cmd[1:]]
+    
+    if duration is None:
+        result = subprocess.run(cmd, input=input_bytes,
+                                stdin=subprocess.DEVNULL if input_bytes is None else None,
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, timeout=timeout)
+        return subprocess.CompletedProcess(cmd, result.returncode, None,
+                                           result.stderr.decode(errors="replace"))
+    
+    cmd = [cmd[0], "-progress", "pipe:1", *cmd[1:]]
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_bytes is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
+    stderr_chunks = []
+    
+    def feed_stdin():
+        try:
+            process.stdin.write(input_bytes)
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+    
+    def read_progress():
+        shown = -1
+        for line in process.stdout:
+            key, _, value = line.decode(errors="replace").strip().partition("=")
+            if key == "out_time_us" and value.isdigit():
+                pct = min(100, int(int(value) / 1e6 / duration * 100))
+                if pct // 10 > shown:
+                    shown = pct // 10
+                    print(f"  ⏳ {pct}%")
+    
+    workers = [
+        threading.Thread(target=read_progress, daemon=True),
+        threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True),
+    ]
+    if input_bytes is not None:
+        workers.append(threading.Thread(target=feed_stdin, daemon=True))
+    for w in workers:
+        w.start()
+    
     try:
-        cmd = [
-            "ffprobe", "-v", "quiet", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", VIDEO_FILE
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            duration = float(result.stdout.strip())
-            print(f"  📊 Video duration: {duration:.1f}s")
-            return duration
-        else:
-            print("  ⚠️  Could not determine video duration, using 45s")
-            return 45.0
-    except Exception as e:
-        print(f"  ⚠️  Error getting duration: {e}, using 45s")
-        return 45.0
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        for w in workers:
+            w.join(timeout=5)
+    
+    stderr = b"".join(stderr_chunks).decode(errors="replace")
+    return subprocess.CompletedProcess(cmd, process.returncode, None, stderr)
 
-def create_intro():
-    """Create intro video segment"""
-    print("🎬 Creating intro...")
+def parameter_sets(video_file):
+    """(SPS list, PPS list) from a file's avcC extradata, or None"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_data", "-show_entries", "stream=extradata",
+        "-of", "default=noprint_wrappers=1",
+        video_file
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return None
+    if result.returncode != 0:
+        return None
     
-    intro_file = os.path.abspath("temp_intro.mp4")
+    # -show_data dump lines: "00000000: 0164 001f ...  .d..", 40 hex columns
+    hex_dump = "".join(line[10:50] for line in result.stdout.splitlines()
+                       if line[8:10] == ": ")
+    avcc = bytes.fromhex(hex_dump.replace(" ", ""))
     
-    # Create temporary text files to avoid escaping issues
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        title_file = f.name
-        f.write(CURRENT_TEXTS["intro_title"])
+    def read_sets(pos, count):
+        sets = []
+        for _ in range(count):
+            size = int.from_bytes(avcc[pos:pos + 2], "big")
+            sets.append(avcc[pos + 2:pos + 2 + size])
+            pos += 2 + size
+        return sets, pos
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        subtitle_file = f.name
-        f.write(CURRENT_TEXTS["intro_subtitle"])
+    try:
+        sps, pos = read_sets(6, avcc[5] & 0x1F)
+        pps, _ = read_sets(pos + 1, avcc[pos])
+    except IndexError:
+        return None
+    return sps, pps
+
+def check_parameter_sets(segment_files):
+    """Verify each segment carries the main video's SPS/PPS
+    
+    The concat copies the video, so the output's avcC comes from the
+    intro; every segment must share it or strict decoders mis-decode.
+    """
+    reference = parameter_sets(VIDEO_FILE)
+    if not reference:
+        print(f"  ❌ Could not read SPS/PPS from {VIDEO_FILE}")
+        return False
+    
+    ok = True
+    for segment_file in segment_files:
+        segment = parameter_sets(segment_file)
+        if segment == reference:
+            continue
+        ok = False
+        if not segment:
+            print(f"  ❌ Could not read SPS/PPS from {segment_file}")
+            continue
+        for kind, ours, theirs in zip(("SPS", "PPS"), segment, reference):
+            if ours != theirs:
+                print(f"  ❌ {kind} of {segment_file} differs from {VIDEO_FILE}:")
+                print(f"     {' '.join(x.hex() for x in ours)} vs {' '.join(x.hex() for x in theirs)}")
+    return ok
+
+def drawtext_escape(text):
+    """Escape a string for drawtext's text= option inside a filtergraph"""
+    # Option level first (\ ' :), then filtergraph level (\ ' [ ] , ;)
+    for ch in "\\':":
+        text = text.replace(ch, "\\" + ch)
+    for ch in "\\'[],;":
+        text = text.replace(ch, "\\" + ch)
+    return text
+
+def cached_segment_path(name, *config):
+    """Cache location for a segment rendered from the given settings
+    
+    Callers pass the exact filter strings and encode args they run with,
+    so any change to either renders a fresh segment.
+    """
+    key = hashlib.sha256(repr(config).encode()).hexdigest()[:16]
+    return SEGMENT_CACHE_DIR / f"{name}_{key}.mp4"
+
+def store_in_cache(segment_file, cache_path):
+    """Move a freshly rendered segment into the cache, returning its path
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        credit_file = f.name
-        f.write(CURRENT_TEXTS["intro_credit"])
+    The segment is copied to a temp name inside the cache directory and then
+    renamed, so an interrupted copy never leaves a truncated cache hit.
+    """
+    tmp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+        shutil.copyfile(segment_file, tmp_path)
+        os.replace(tmp_path, cache_path)
+        os.remove(segment_file)
+        return str(cache_path)
+    except OSError as e:
+        print(f"  ⚠️  Could not cache segment: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return segment_file if os.path.exists(segment_file) else str(cache_path)
+
+def drawtext_filter(line):
+    """Build one drawtext filter from a title card line"""
+    start = line["fade_in"]
+    end = start + TEXT_FADE_DURATION
+    options = {
+        "fontfile": FONT_FILE,
+        "text": drawtext_escape(CURRENT_TEXTS[line["text"]]),
+        "fontsize": line["fontsize"],
+        "fontcolor": line["color"],
+        "x": "(w-text_w)/2",
+        "y": line["y"],
+        "alpha": f"'if(lt(t,{start}),0,if(lt(t,{end}),(t-{start})/{TEXT_FADE_DURATION},1))'",
+    }
+    return "drawtext=" + ":".join(f"{key}={value}" for key, value in options.items())
+
+def title_card_filtergraph(lines):
+    """Filtergraph drawing the given lines over input 0, labelled [v]"""
+    filters = [drawtext_filter(line) for line in lines] + ["setsar=0"]
+    return "[0:v]" + ",\n".join(filters) + "[v]"
+
+def title_card_source(duration):
+    """lavfi background source for a title card"""
+    return f"color=c={BG_COLOR}:size={VIDEO_WIDTH}x{VIDEO_HEIGHT}:duration={duration}:rate={VIDEO_FPS}"
+
+def cached_title_card_path(name, lines, duration):
+    """Cache location keyed by the title card's source and filtergraph"""
+    return cached_segment_path(name, title_card_source(duration),
+                               title_card_filtergraph(lines), SEGMENT_ENCODE_ARGS)
+
+def render_title_card(segment_file, lines, duration):
+    """Render a title card segment, passing its filtergraph as a script file"""
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(title_card_filtergraph(lines))
+        script_file = f.name
     
     try:
-        # Use textfile option to avoid escaping issues
         cmd = [
             "ffmpeg", "-y",
             "-f", "lavfi",
-            "-i", f"color=c={BG_COLOR}:size={VIDEO_WIDTH}x{VIDEO_HEIGHT}:duration={INTRO_DURATION}:rate={VIDEO_FPS}",
-            "-vf", f"drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={title_file}:fontsize=64:fontcolor={TEXT_COLOR}:x=(w-text_w)/2:y=h/2-100:alpha='if(lt(t,0.5),0,if(lt(t,1.0),(t-0.5)*2,1))',drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={subtitle_file}:fontsize=28:fontcolor={ACCENT_COLOR}:x=(w-text_w)/2:y=h/2-20:alpha='if(lt(t,1.0),0,if(lt(t,1.5),(t-1.0)*2,1))',drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={credit_file}:fontsize=20:fontcolor={TEXT_COLOR}:x=(w-text_w)/2:y=h/2+60:alpha='if(lt(t,2.0),0,if(lt(t,2.5),(t-2.0)*2,1))'",
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            intro_file
+            "-i", title_card_source(duration),
+            "-filter_complex_script", script_file,
+            "-map", "[v]",
+            *SEGMENT_ENCODE_ARGS, *SEGMENT_THREAD_ARGS,
+            segment_file
         ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        # Clean up text files
-        for temp_file in [title_file, subtitle_file, credit_file]:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        return run_ffmpeg(cmd, timeout=30)
+    finally:
+        os.remove(script_file)
+
+def create_intro():
+    """Create intro video segment (cached across runs)"""
+    print("🎬 Creating intro...")
+    
+    cache_path = cached_title_card_path("intro", INTRO_LINES, INTRO_DURATION)
+    if cache_path.exists():
+        print(f"  ✅ Intro reused from cache: {cache_path}")
+        return str(cache_path)
+    
+    intro_file = os.path.abspath("temp_intro.mp4")
+    
+    try:
+        result = render_title_card(intro_file, INTRO_LINES, INTRO_DURATION)
         
         if result.returncode == 0:
             print(f"  ✅ Intro created: {intro_file}")
-            return intro_file
+            return store_in_cache(intro_file, cache_path)
         else:
             print(f"  ❌ Failed to create intro: {result.stderr}")
             return None
             
     except Exception as e:
         print(f"  ❌ Error creating intro: {e}")
-        # Clean up on error
-        for temp_file in [title_file, subtitle_file, credit_file]:
-            if os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
         return None
 
 def create_pause_segment():
-    """Create a pause segment holding the last frame"""
+    """Create a pause segment holding the last frame (cached by that frame)"""
     print("📷 Creating pause segment...")
     
     pause_file = os.path.abspath("temp_pause.mp4")
+    frame_file = os.path.abspath("temp_last_frame.png")
     
     try:
-        # Extract last frame from ORIGINAL video (not the one with audio fade)
+        # Extract last frame from ORIGINAL video (not the faded final output)
         # This ensures we get the bright, unfaded last frame
         cmd = [
             "ffmpeg", "-y",
-            "-sseof", "-1",  # Seek to last frame
-            "-i", VIDEO_FILE,  # Use original video, not temp_video_with_audio
-            "-vf", f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}",
-            "-t", str(PAUSE_DURATION),
-            "-r", str(VIDEO_FPS),
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
+            "-sseof", "-0.05",  # Seek to last frame
+            "-i", VIDEO_FILE,
+            "-vframes", "1",
+            frame_file
+        ]
+        
+        result = run_ffmpeg(cmd, timeout=30)
+        
+        if result.returncode != 0:
+            print(f"  ❌ Failed to extract last frame: {result.stderr}")
+            return None
+        
+        # Hold the still image for the pause duration
+        hold_args = ["-loop", "1", "-t", str(PAUSE_DURATION)]
+        video_filter = f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT},setsar=0"
+        
+        frame_hash = hashlib.sha256(Path(frame_file).read_bytes()).hexdigest()
+        cache_path = cached_segment_path("pause", frame_hash, hold_args,
+                                         video_filter, SEGMENT_ENCODE_ARGS)
+        if cache_path.exists():
+            print(f"  ✅ Pause reused from cache: {cache_path}")
+            return str(cache_path)
+        
+        cmd = [
+            "ffmpeg", "-y",
+            *hold_args,
+            "-i", frame_file,
+            "-vf", video_filter,
+            *SEGMENT_ENCODE_ARGS, *SEGMENT_THREAD_ARGS,
             pause_file
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        result = run_ffmpeg(cmd, timeout=30)
         
         if result.returncode == 0:
             print(f"  ✅ Pause segment created: {pause_file}")
-            return pause_file
+            return store_in_cache(pause_file, cache_path)
         else:
             print(f"  ❌ Failed to create pause: {result.stderr}")
             return None
@@ -216,174 +461,124 @@ def create_pause_segment():
     except Exception as e:
         print(f"  ❌ Error creating pause: {e}")
         return None
+    
+    finally:
+        if os.path.exists(frame_file):
+            os.unlink(frame_file)
 
 def create_outro():
-    """Create outro video segment"""
+    """Create outro video segment (cached across runs)"""
     print("🎬 Creating outro...")
     
-    outro_file = os.path.abspath("temp_outro.mp4")
-    
-    # Create temporary text files to avoid escaping issues
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        title_file = f.name
-        f.write(CURRENT_TEXTS["outro_title"])
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        subtitle_file = f.name
-        f.write(CURRENT_TEXTS["outro_subtitle"])
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        footer_file = f.name
-        f.write(CURRENT_TEXTS["outro_footer"])
+    cache_path = cached_title_card_path("outro", OUTRO_LINES, OUTRO_DURATION)
+    if cache_path.exists():
+        print(f"  ✅ Outro reused from cache: {cache_path}")
+        return str(cache_path)
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        github_file = f.name
-        f.write(CURRENT_TEXTS["outro_github"])
+    outro_file = os.path.abspath("temp_outro.mp4")
     
     try:
-        # Use textfile option to avoid escaping issues
-        cmd = [
-            "ffmpeg", "-y",
-            "-f", "lavfi",
-            "-i", f"color=c={BG_COLOR}:size={VIDEO_WIDTH}x{VIDEO_HEIGHT}:duration={OUTRO_DURATION}:rate={VIDEO_FPS}",
-            "-vf", f"drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={title_file}:fontsize=48:fontcolor={TEXT_COLOR}:x=(w-text_w)/2:y=h/2-100:alpha='if(lt(t,0.5),0,if(lt(t,1.0),(t-0.5)*2,1))',drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={subtitle_file}:fontsize=24:fontcolor={ACCENT_COLOR}:x=(w-text_w)/2:y=h/2-30:alpha='if(lt(t,1.0),0,if(lt(t,1.5),(t-1.0)*2,1))',drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={footer_file}:fontsize=16:fontcolor={TEXT_COLOR}:x=(w-text_w)/2:y=h/2+40:alpha='if(lt(t,2.0),0,if(lt(t,2.5),(t-2.0)*2,1))',drawtext=fontfile=/System/Library/Fonts/Helvetica.ttc:textfile={github_file}:fontsize=18:fontcolor={ACCENT_COLOR}:x=(w-text_w)/2:y=h/2+80:alpha='if(lt(t,3.0),0,if(lt(t,3.5),(t-3.0)*2,1))'",
-            "-c:v", "libx264",
-            "-pix_fmt", "yuv420p",
-            outro_file
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        # Clean up text files
-        for temp_file in [title_file, subtitle_file, footer_file, github_file]:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        result = render_title_card(outro_file, OUTRO_LINES, OUTRO_DURATION)
         
         if result.returncode == 0:
             print(f"  ✅ Outro created: {outro_file}")
-            return outro_file
+            return store_in_cache(outro_file, cache_path)
         else:
             print(f"  ❌ Failed to create outro: {result.stderr}")
             return None
             
     except Exception as e:
         print(f"  ❌ Error creating outro: {e}")
-        # Clean up on error
-        for temp_file in [title_file, subtitle_file, footer_file, github_file]:
-            if os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
         return None
 
-def combine_video_audio():
-    """Combine video and audio using FFmpeg (creates temp file)"""
-    print("� Adding music to video...")
-    
-    # Get video duration for audio processing
-    video_duration = get_video_duration()
-    
-    # Check if we need to loop the audio
-    audio_needs_looping = video_duration > 30.0  # Assume audio might be shorter
-    
-    # Build FFmpeg command with audio looping if needed
-    if audio_needs_looping:
-        # Loop audio to match video duration
-        audio_filter = f"aloop=loop=-1:size={int(SAMPLE_RATE*video_duration)},volume={AUDIO_VOLUME},afade=t=in:st=0:d={AUDIO_FADE_IN},afade=t=out:st={video_duration-AUDIO_FADE_OUT}:d={AUDIO_FADE_OUT}"
-        print("  🔄 Audio will be looped to match video duration")
-    else:
-        audio_filter = f"volume={AUDIO_VOLUME},afade=t=in:st=0:d={AUDIO_FADE_IN},afade=t=out:st={video_duration-AUDIO_FADE_OUT}:d={AUDIO_FADE_OUT}"
-    
-    cmd = [
-        "ffmpeg",
-        "-i", VIDEO_FILE,           # Input video
-        "-i", AUDIO_FILE,           # Input audio
-        "-c:v", "copy",             # Copy video stream (no re-encoding)
-        "-c:a", "aac",              # Encode audio as AAC
-        "-b:a", "128k",             # Audio bitrate
-        "-t", str(video_duration),  # Set output duration to match video
-        "-filter:a", audio_filter,
-        "-y",                       # Overwrite output file
-        TEMP_VIDEO_WITH_AUDIO
-    ]
+def create_segments():
+    """Create intro, pause, and outro (independent FFmpeg runs, in parallel)"""
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futs = [ex.submit(create_intro), ex.submit(create_pause_segment), ex.submit(create_outro)]
+        return [f.result() for f in futs]
+
+def remove_segments(segment_files, keep_cached=True):
+    """Delete rendered segment files, optionally keeping cached ones"""
+    for segment_file in segment_files:
+        if not segment_file or (keep_cached and Path(segment_file).parent == SEGMENT_CACHE_DIR):
+            continue
+        try:
+            os.unlink(segment_file)
+        except OSError:
+            pass
+
+def create_complete_video(audio_data=None, sample_rate=None):
+    """Create complete video with intro, main content, pause, and outro
     
-    print(f"  🔧 Running: {' '.join(cmd[:6])} ... (+ audio filters)")
+    If audio_data (mono int16 samples) is given it is piped to FFmpeg's
+    stdin instead of reading AUDIO_FILE.
+    """
+    print("🎬 Creating complete video with intro, pause, and outro...")
     
+    segments = create_segments()
+    concat_file = None
     try:
-        # Run FFmpeg with progress
-        process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
-            text=True
-        )
+        if not all(segments):
+            print("  ❌ Failed to create intro/pause/outro sections")
+            return False
         
-        # Monitor progress
-        stdout, stderr = process.communicate()
+        # Segments share the main video's encoding, so the concat demuxer can
+        # copy all video bit-for-bit - but only if their SPS/PPS still match.
+        # Cached segments go stale when ffmpeg/x264 or main.py change, so
+        # evict them and render once more before giving up.
+        if not check_parameter_sets(segments):
+            if not any(Path(f).parent == SEGMENT_CACHE_DIR for f in segments):
+                return False
+            print("  🔄 Evicting cached segments and rendering them again...")
+            remove_segments(segments, keep_cached=False)
+            segments = create_segments()
+            if not all(segments):
+                print("  ❌ Failed to create intro/pause/outro sections")
+                return False
+            if not check_parameter_sets(segments):
+                remove_segments(segments, keep_cached=False)
+                return False
+        intro_file, pause_file, outro_file = segments
         
-        if process.returncode == 0:
-            print(f"  ✅ Success! Created: {TEMP_VIDEO_WITH_AUDIO}")
-            return True
+        # Create a temporary file list for FFmpeg concat with absolute paths
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            concat_file = f.name
+            f.write(f"file '{os.path.abspath(intro_file)}'\n")
+            f.write(f"file '{os.path.abspath(VIDEO_FILE)}'\n")
+            f.write(f"file '{os.path.abspath(pause_file)}'\n")
+            f.write(f"file '{os.path.abspath(outro_file)}'\n")
+        
+        # Video is stream-copied; only the continuous music is encoded
+        total_duration = INTRO_DURATION + MAIN_DURATION + PAUSE_DURATION + OUTRO_DURATION
+        
+        if audio_data is None:
+            audio_input = [
+                "-stream_loop", "-1",            # Loop the music if it is shorter
+                "-i", AUDIO_FILE,                # Input 1: full music track
+            ]
+            audio_bytes = None
         else:
-            print(f"  ❌ FFmpeg failed with return code {process.returncode}")
-            print(f"  Error output: {stderr}")
-            return False
-            
-    except Exception as e:
-        print(f"  ❌ Error running FFmpeg: {e}")
-        return False
-
-def create_complete_video():
-    """Create complete video with intro, main content, pause, and outro"""
-    print("🎬 Creating complete video with intro, pause, and outro...")
-    
-    # Create intro, pause, and outro
-    intro_file = create_intro()
-    pause_file = create_pause_segment()
-    outro_file = create_outro()
-    
-    if not intro_file or not pause_file or not outro_file:
-        print("  ❌ Failed to create intro/pause/outro sections")
-        return False
-    
-    # Create a temporary file list for FFmpeg concat with absolute paths
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        concat_file = f.name
-        f.write(f"file '{os.path.abspath(intro_file)}'\n")
-        f.write(f"file '{os.path.abspath(TEMP_VIDEO_WITH_AUDIO)}'\n")
-        f.write(f"file '{os.path.abspath(pause_file)}'\n")
-        f.write(f"file '{os.path.abspath(outro_file)}'\n")
-    
-    try:
-        # Use separate inputs with continuous music throughout
-        total_duration = INTRO_DURATION + 45.0 + PAUSE_DURATION + OUTRO_DURATION
+            audio_input = [
+                "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+                "-i", "pipe:0",                  # Input 1: raw music from stdin
+            ]
+            audio_bytes = audio_data.tobytes()
         
         cmd = [
             "ffmpeg", "-y",
-            "-i", intro_file,                    # Input 0: intro (video only)
-            "-i", TEMP_VIDEO_WITH_AUDIO,         # Input 1: main video (video + audio)
-            "-i", pause_file,                    # Input 2: pause (video only)
-            "-i", outro_file,                    # Input 3: outro (video only)
-            "-i", AUDIO_FILE,                    # Input 4: full music track
-            "-filter_complex", f"""
-            [0:v][1:v][2:v][3:v]concat=n=4:v=1:a=0[outv];
-            [4:a]volume={AUDIO_VOLUME},afade=t=in:st=0:d={AUDIO_FADE_IN},afade=t=out:st={total_duration-AUDIO_FADE_OUT}:d={AUDIO_FADE_OUT}[outa]
-            """.replace('\n', '').replace('            ', ''),
-            "-map", "[outv]",
-            "-map", "[outa]",
-            "-c:v", "libx264",
+            "-f", "concat", "-safe", "0",
+            "-i", concat_file,                   # Input 0: intro + main + pause + outro
+            *audio_input,
+            "-filter:a", f"volume={AUDIO_VOLUME},afade=t=in:st=0:d={AUDIO_FADE_IN},afade=t=out:st={total_duration-AUDIO_FADE_OUT}:d={AUDIO_FADE_OUT}",
+            "-map", "0:v",
+            "-map", "1:a",
+            "-c:v", "copy",
             "-c:a", "aac",
             "-t", str(total_duration),  # Ensure exact duration
             FINAL_OUTPUT
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        
-        # Clean up temporary files
-        for temp_file in [concat_file, intro_file, pause_file, outro_file, TEMP_VIDEO_WITH_AUDIO]:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
+        result = run_ffmpeg(cmd, timeout=120, input_bytes=audio_bytes, duration=total_duration)
         
         if result.returncode == 0:
             print(f"  ✅ Complete video created: {FINAL_OUTPUT}")
@@ -394,14 +589,11 @@ def create_complete_video():
             
     except Exception as e:
         print(f"  ❌ Error creating complete video: {e}")
-        # Clean up on error
-        for temp_file in [concat_file, intro_file, outro_file, TEMP_VIDEO_WITH_AUDIO]:
-            if os.path.exists(temp_file):
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
         return False
+    
+    finally:
+        # Clean up temporary files (cached segments are kept)
+        remove_segments([concat_file, *segments])
 
 def get_file_info():
     """Display information about the final file"""
@@ -452,20 +644,19 @@ def main():
         return False
     
     if not check_input_files():
-        print("\n❌ Missing required files. Please ensure you have:")
-        print(f"   1. {VIDEO_FILE} (run main.py)")
-        print(f"   2. {AUDIO_FILE} (run generate_music.py)")
+        print("\n❌ Missing required file. Please ensure you have:")
+        print(f"   {VIDEO_FILE} (run main.py)")
         return False
     
-    # Step 1: Combine video with audio
-    print("\n📝 Step 1: Adding music to video...")
-    if not combine_video_audio():
-        print("❌ Failed to add music to video")
-        return False
+    # Without a rendered WAV, synthesize the music and stream it straight in
+    audio_data, sample_rate = None, None
+    if not Path(AUDIO_FILE).exists():
+        print("\n📝 Synthesizing music in-process...")
+        audio_data, sample_rate = synthesize_music()
     
-    # Step 2: Add intro, pause, and outro
-    print("\n📝 Step 2: Adding intro, pause, and outro...")
-    if not create_complete_video():
+    # Single pass: intro + music video + pause + outro
+    print("\n📝 Building intro, music video, pause, and outro...")
+    if not create_complete_video(audio_data, sample_rate):
         print("❌ Failed to create complete video")
         return False
     
@@ -478,13 +669,13 @@ def main():
     print("   🎬 Ready for sharing and presentations!")
     
     # Calculate total duration
-    total_duration = INTRO_DURATION + 45.0 + PAUSE_DURATION + OUTRO_DURATION  # ~57 seconds
+    total_duration = INTRO_DURATION + MAIN_DURATION + PAUSE_DURATION + OUTRO_DURATION  # 60 seconds
     print(f"\n📊 Video structure:")
     print(f"   🎬 Intro: {INTRO_DURATION}s")
-    print(f"   🎵 Main content: ~45s (with music)")
+    print(f"   🎵 Main content: {MAIN_DURATION}s (with music)")
     print(f"   📷 Pause: {PAUSE_DURATION}s (last frame hold)")
     print(f"   🎭 Outro: {OUTRO_DURATION}s")
-    print(f"   ⏱️  Total: ~{total_duration}s")
+    print(f"   ⏱️  Total: {total_duration}s")
     print(f"   🎵 Music: Continuous throughout entire video")
     
     # Suggest next steps
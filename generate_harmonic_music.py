@@ -4,29 +4,31 @@
 # Less complexity, more pure musical beauty
 
 import numpy as np
-import wave
-import math
+import soundfile as sf
 
 # Audio parameters
 SAMPLE_RATE = 44100
 DURATION = 60.0  # seconds - intro(4) + main(46) + pause(2) + outro(8) = exactly 60s
 TOTAL_SAMPLES = int(SAMPLE_RATE * DURATION)
 MAX_AMPLITUDE = 32767 // 4  # Gentle volume
+SAMPLE_DTYPE = np.float32  # Synthesis buffers (far finer than the int16 output)
 
 # Musical parameters - simple and beautiful
 BPM = 72  # Calm, heart-rate tempo
 BEAT_LENGTH = 60.0 / BPM
 MEASURE_LENGTH = BEAT_LENGTH * 4
 
-# Simple, pure waveforms
-def pure_sine(freq, t):
-    """Pure sine wave - the most harmonic sound"""
-    return math.sin(2 * math.pi * freq * t)
+# Simple, pure waveforms (omega = 2*pi*freq, precomputed by the caller)
+# The phase omega*t stays float64 (it reaches ~5e5 rad over 60 s), the
+# resulting samples are stored as SAMPLE_DTYPE
+def pure_sine(omega, t):
+    """Pure sine wave - the most harmonic sound (t may be a sample array)"""
+    return np.sin(omega * t).astype(SAMPLE_DTYPE)
 
-def soft_square(freq, t):
-    """Soft square wave with rounded edges"""
-    sine = math.sin(2 * math.pi * freq * t)
-    return math.copysign(1.0, sine) * (abs(sine) ** 0.3)
+def soft_square(omega, t):
+    """Soft square wave with rounded edges (t may be a sample array)"""
+    sine = np.sin(omega * t)
+    return np.copysign(1.0, sine) * (np.abs(sine) ** 0.3)
 
 # Beautiful, simple harmony - C Major pentatonic (no harsh intervals)
 # The most universally pleasing scale
@@ -40,6 +42,7 @@ C_MAJOR_PENTATONIC = {
     'D5': 587.33,
     'E5': 659.25
 }
+OMEGAS = {note: 2 * np.pi * freq for note, freq in C_MAJOR_PENTATONIC.items()}
 
 # Simple, beautiful chord progression - the "Circle of Fifths" in C Major
 # This is mathematically perfect harmony
@@ -53,6 +56,7 @@ BEAUTIFUL_CHORDS = [
     # G Major - Joy, uplift, resolution
     [C_MAJOR_PENTATONIC['G4'], 246.94, C_MAJOR_PENTATONIC['D5']]  # G4, B4, D5
 ]
+CHORD_OMEGAS = 2 * np.pi * np.array(BEAUTIFUL_CHORDS)  # (n_chords, n_notes)
 
 # Simple, memorable melody - "Synchronized Hearts" theme
 # Like a lullaby that represents metronomes finding harmony
@@ -66,136 +70,129 @@ HEART_MELODY = [
     # Phrase 4: "In perfect harmony"
     C_MAJOR_PENTATONIC['C4'], C_MAJOR_PENTATONIC['D4'], C_MAJOR_PENTATONIC['E4'], C_MAJOR_PENTATONIC['C4']
 ]
+MELODY_OMEGAS = [2 * np.pi * freq for freq in HEART_MELODY]
 
 def generate_synchronized_hearts():
     """Generate simple, beautiful, harmonic music about synchronization"""
     print("💝 Generating 'Synchronized Hearts' - Simple & Beautiful")
     print("   Theme: The magic moment when separate rhythms become one")
     
-    # Initialize audio
-    audio = np.zeros(TOTAL_SAMPLES)
+    # Shared sample clock; each layer is built on its own and mixed once.
+    # t (float64) drives oscillator phases, t32 the slow envelopes
+    t = np.arange(TOTAL_SAMPLES) / SAMPLE_RATE
+    t32 = t.astype(SAMPLE_DTYPE)
     
     # === FOUNDATION: Gentle Bass Heart Beat ===
     print("  💓 Adding gentle heartbeat bass...")
-    bass_note = 130.81  # C3 - fundamental, grounding
+    bass_omega = 2 * np.pi * 130.81  # C3 - fundamental, grounding
     
-    for i in range(TOTAL_SAMPLES):
-        t = i / SAMPLE_RATE
-        
-        # Simple, steady heartbeat pattern
-        beat_position = (t / BEAT_LENGTH) % 2
-        if beat_position < 0.1:  # Heartbeat on 1 and 3
-            heartbeat_env = math.exp(-beat_position * 20)  # Quick decay
-            bass_tone = pure_sine(bass_note, t) * heartbeat_env * 0.15
-        else:
-            bass_tone = pure_sine(bass_note, t) * 0.03  # Gentle sustain
-        
-        audio[i] += bass_tone
+    # Simple, steady heartbeat pattern
+    beat_position = (t / BEAT_LENGTH) % 2
+    heartbeat_env = np.where(beat_position < 0.1,  # Heartbeat on 1 and 3
+                             np.exp(-beat_position.astype(SAMPLE_DTYPE) * 20) * 0.15,  # Quick decay
+                             SAMPLE_DTYPE(0.03))  # Gentle sustain
+    bass = pure_sine(bass_omega, t) * heartbeat_env
     
     # === HARMONY: Pure Chord Progression ===
     print("  🎵 Adding pure harmonic chords...")
     
-    for i in range(TOTAL_SAMPLES):
-        t = i / SAMPLE_RATE
-        
-        # Simple chord timing - one chord per measure
-        measure_pos = (t / MEASURE_LENGTH) % len(BEAUTIFUL_CHORDS)
-        chord_index = int(measure_pos)
-        
-        chord = BEAUTIFUL_CHORDS[chord_index]
-        
-        # Pure sine wave chords for maximum harmony
-        chord_sound = 0
-        for note_freq in chord:
-            chord_sound += pure_sine(note_freq, t) * 0.08
-        
-        # Gentle swell within each measure
-        measure_progress = (measure_pos - chord_index)
-        swell = 0.7 + 0.3 * math.sin(measure_progress * math.pi)
-        
-        audio[i] += chord_sound * swell
+    # Simple chord timing - one chord per measure
+    measure_pos = (t / MEASURE_LENGTH) % len(BEAUTIFUL_CHORDS)
+    chord_index = measure_pos.astype(int)
+    
+    # Gentle swell within each measure
+    measure_progress = (measure_pos - chord_index).astype(SAMPLE_DTYPE)
+    swell = 0.7 + 0.3 * np.sin(measure_progress * np.pi)
+    
+    # Pure sine wave chords for maximum harmony; each chord is only
+    # synthesised over the samples of its own measures
+    chord_waves = np.zeros(TOTAL_SAMPLES, dtype=SAMPLE_DTYPE)
+    for k, chord_omegas in enumerate(CHORD_OMEGAS):
+        mask = chord_index == k
+        tk = t[mask]
+        chord_sound = np.zeros(tk.shape, dtype=SAMPLE_DTYPE)
+        for omega in chord_omegas:
+            chord_sound += pure_sine(omega, tk) * 0.08
+        chord_waves[mask] = chord_sound
+    
+    chords = chord_waves * swell
     
     # === MELODY: "Synchronized Hearts" Theme ===
     print("  🎼 Adding 'Synchronized Hearts' melody...")
     
     note_duration = MEASURE_LENGTH / 2  # Half notes for a gentle pace
     melody_start_time = 8.0  # Start after intro
+    note_samples = int(note_duration * SAMPLE_RATE)
+    
+    # Gentle envelope like breathing (shared by every note)
+    progress = (np.arange(note_samples) / note_samples).astype(SAMPLE_DTYPE)
+    envelope = np.ones(note_samples, dtype=SAMPLE_DTYPE)
+    attack = progress < 0.3  # Gentle attack
+    release = progress > 0.7  # Gentle release
+    envelope[attack] = progress[attack] / 0.3
+    envelope[release] = (1.0 - progress[release]) / 0.3
+    
+    melody = np.zeros(TOTAL_SAMPLES, dtype=SAMPLE_DTYPE)
     
     # Play the melody multiple times with variations
     for cycle in range(3):  # 3 cycles of the melody
         cycle_start = melody_start_time + cycle * len(HEART_MELODY) * note_duration
         
         if cycle_start < DURATION - 8.0:  # Leave room for outro
-            for note_idx, freq in enumerate(HEART_MELODY):
+            for note_idx, omega in enumerate(MELODY_OMEGAS):
                 note_start = cycle_start + note_idx * note_duration
                 
                 if note_start < DURATION - 8.0:
                     start_sample = int(note_start * SAMPLE_RATE)
-                    note_samples = int(note_duration * SAMPLE_RATE)
+                    end_sample = min(start_sample + note_samples, TOTAL_SAMPLES)
+                    t_note = t[start_sample:end_sample]
+                    env = envelope[:end_sample - start_sample]
+                    
+                    # Different timbres for different cycles
+                    if cycle == 0:  # Pure sine
+                        melody_tone = pure_sine(omega, t_note) * env * 0.12
+                    elif cycle == 1:  # Octave doubling
+                        melody_tone = (pure_sine(omega, t_note) + pure_sine(omega * 2, t_note) * 0.3) * env * 0.10
+                    else:  # Soft harmony
+                        melody_tone = (pure_sine(omega, t_note) + pure_sine(omega * 1.5, t_note) * 0.4) * env * 0.09
                     
-                    for i in range(note_samples):
-                        if start_sample + i >= TOTAL_SAMPLES:
-                            break
-                        
-                        t = (start_sample + i) / SAMPLE_RATE
-                        
-                        # Gentle envelope like breathing
-                        progress = i / note_samples
-                        if progress < 0.3:  # Gentle attack
-                            envelope = progress / 0.3
-                        elif progress > 0.7:  # Gentle release
-                            envelope = (1.0 - progress) / 0.3
-                        else:
-                            envelope = 1.0
-                        
-                        # Different timbres for different cycles
-                        if cycle == 0:  # Pure sine
-                            melody_tone = pure_sine(freq, t) * envelope * 0.12
-                        elif cycle == 1:  # Octave doubling
-                            melody_tone = (pure_sine(freq, t) + pure_sine(freq * 2, t) * 0.3) * envelope * 0.10
-                        else:  # Soft harmony
-                            melody_tone = (pure_sine(freq, t) + pure_sine(freq * 1.5, t) * 0.4) * envelope * 0.09
-                        
-                        audio[start_sample + i] += melody_tone
+                    melody[start_sample:end_sample] += melody_tone
     
     # === ATMOSPHERE: Gentle Resonance ===
     print("  ✨ Adding gentle atmospheric resonance...")
     
-    for i in range(TOTAL_SAMPLES):
-        t = i / SAMPLE_RATE
-        
-        if t > 12.0 and t < 48.0:  # Only during main section
-            # Very slow, gentle resonance like a distant church bell
-            resonance = pure_sine(C_MAJOR_PENTATONIC['C5'] * 2, t * 0.1) * 0.02
-            resonance += pure_sine(C_MAJOR_PENTATONIC['G4'] * 2, t * 0.07) * 0.015
-            
-            audio[i] += resonance
+    main_section = (t > 12.0) & (t < 48.0)  # Only during main section
+    tm = t[main_section]
+    
+    # Very slow, gentle resonance like a distant church bell
+    resonance = pure_sine(OMEGAS['C5'] * 2, tm * 0.1) * 0.02
+    resonance += pure_sine(OMEGAS['G4'] * 2, tm * 0.07) * 0.015
+    
+    atmosphere = np.zeros(TOTAL_SAMPLES, dtype=SAMPLE_DTYPE)
+    atmosphere[main_section] = resonance
     
     # === MASTER ENVELOPE: Natural Breathing ===
     print("  🌬️  Adding natural breathing dynamics...")
     
-    for i in range(TOTAL_SAMPLES):
-        t = i / SAMPLE_RATE
-        
-        # Main envelope
-        fade_factor = 1.0
-        if t < 6.0:  # Slow, natural fade in
-            fade_factor = (t / 6.0) ** 0.7
-        elif t > DURATION - 8.0:  # Gentle fade out
-            fade_factor = ((DURATION - t) / 8.0) ** 0.5
-        
-        # Gentle breathing throughout (very subtle)
-        breathing = 1.0 + 0.05 * math.sin(t * 0.2)  # Very slow breathing
-        
-        audio[i] *= fade_factor * breathing
+    # Main envelope
+    fade_factor = np.ones(TOTAL_SAMPLES, dtype=SAMPLE_DTYPE)
+    fade_in = t < 6.0  # Slow, natural fade in
+    fade_out = ~fade_in & (t > DURATION - 8.0)  # Gentle fade out
+    fade_factor[fade_in] = (t32[fade_in] / 6.0) ** 0.7
+    fade_factor[fade_out] = ((DURATION - t32[fade_out]) / 8.0) ** 0.5
+    
+    # Gentle breathing throughout (very subtle)
+    breathing = 1.0 + 0.05 * np.sin(t32 * 0.2)  # Very slow breathing
+    
+    # === MIX: all layers and the master envelope in a single pass ===
+    audio = (bass + chords + melody + atmosphere) * (fade_factor * breathing)
     
     # === FINAL TOUCH: Warm Limiting ===
     print("  🔥 Adding warm, gentle processing...")
     
     # Soft, musical limiting
-    for i in range(len(audio)):
-        if abs(audio[i]) > 0.8:
-            audio[i] = 0.8 * np.sign(audio[i]) * math.tanh(abs(audio[i]))
+    magnitude = np.abs(audio)
+    audio = np.where(magnitude > 0.8, 0.8 * np.sign(audio) * np.tanh(magnitude), audio)
     
     # Gentle normalization
     max_val = np.max(np.abs(audio))
@@ -210,11 +207,8 @@ def generate_synchronized_hearts():
 
 def save_harmonic_music(audio_data, filename="synchronized_hearts.wav"):
     """Save the beautiful harmonic music"""
-    with wave.open(filename, 'w') as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 16-bit  
-        wav_file.setframerate(SAMPLE_RATE)
-        wav_file.writeframes(audio_data.tobytes())
+    # Mono 16-bit PCM, written straight from the numpy buffer
+    sf.write(filename, audio_data, SAMPLE_RATE, subtype='PCM_16')
     
     print(f"✅ Saved: {filename}")
     print(f"   Duration: {DURATION}s")
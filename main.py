@@ -6,19 +6,34 @@
 # - English captions (Kuramoto + harmony + energy), end credits
 # - Deterministic MP4 via imageio-ffmpeg
 #
-# Install: pip install pygame numpy imageio imageio-ffmpeg
+# Install: pip install pygame numpy numba scipy imageio imageio-ffmpeg
 
+import os
+import queue
+import threading
 import pygame as pg
 import pygame.gfxdraw as gfx
 import numpy as np
 import math
-import imageio.v2 as imageio
+from functools import lru_cache
+import imageio_ffmpeg
+# Kernels are only launched from the main thread. numba's TBB pool deadlocks
+# interpreter exit once ffmpeg has been forked for the writer.
+os.environ.setdefault("NUMBA_THREADING_LAYER", "workqueue")
+from numba import njit, prange
+from scipy.sparse import csr_matrix
+from scipy.spatial.distance import cdist
+from scipy.sparse.csgraph import connected_components
 
 # ========= Output (video) =========
 W, H         = 1280, 720
 VIDEO_FPS    = 30
 DURATION_S   = 46.0
 TOTAL_FRAMES = int(VIDEO_FPS * DURATION_S)
+# combine_video_audio.py stream-copies this video next to its own segments, so
+# its MAIN_VIDEO_QUALITY / MAIN_VIDEO_PRESET must match these two
+VIDEO_QUALITY = 8           # imageio quality → x264 crf 10
+VIDEO_PRESET  = "veryfast"
 OUT_MP4      = "metronomes_sync_46s_lock40_pastel_spatial_phase.mp4"
 
 # ========= Palette (Zen Teal + Pastels) =========
@@ -72,6 +87,7 @@ T_LOCK_TARGET  = 40.0          # strong coupling reached near 40 s
 
 # Tiny phase noise keeps system near threshold longer (still locks)
 NOISE_STD = 0.02
+NOISE_SCALE = NOISE_STD * math.sqrt(DT)   # per-substep diffusion amplitude
 
 # ========= Global lock (hold) =========
 R_LOCK          = 0.985        # global r threshold
@@ -139,50 +155,64 @@ def grid_positions(n=N, rows=ROWS):
 # ========= Init =========
 rng = np.random.default_rng(SEED)
 xs, ys   = grid_positions(N, ROWS)
+xs_i, ys_i = xs.astype(np.int32), ys.astype(np.int32)  # pixel coords for drawing
+BASES    = list(zip(xs_i.tolist(), ys_i.tolist()))     # fixed rod bases as int tuples
 omega    = rng.normal(2.0*math.pi*OMEGA_MEAN_HZ, OMEGA_SPREAD, size=N)
 theta    = rng.uniform(-math.pi, math.pi, size=N)
 t_start  = rng.uniform(0.0, SPREAD_START_SEC, size=N)
+# phase noise for every substep, drawn up front (same stream as per-step draws),
+# pre-scaled and stored in float32 like the rest of the physics state
+noise    = (NOISE_SCALE * rng.standard_normal((TOTAL_FRAMES, SUBSTEPS, N))).astype(np.float32)
 
 # Spatial weights (row-normalized, no self-coupling)
-X = xs.reshape(-1,1); Y = ys.reshape(-1,1)
-dists   = np.sqrt((X - X.T)**2 + (Y - Y.T)**2)
+pts     = np.column_stack([xs, ys])
+dists   = cdist(pts, pts)
 weights = np.exp(-dists / LAMBDA)
 np.fill_diagonal(weights, 0.0)
 row_sums = np.sum(weights, axis=1, keepdims=True)
 row_sums[row_sums == 0] = 1.0
-Wnorm = weights / row_sums  # scaled by K_eff(t) inside step()
+Wnorm = weights / row_sums  # scaled by K_eff(t) inside _advance_frame()
+
+# Physics arrays in float32 (half the bytes per coupling pass); time t stays float64
+Wnorm   = Wnorm.astype(np.float32)
+omega   = omega.astype(np.float32)
+theta   = theta.astype(np.float32)
+t_start = t_start.astype(np.float32)
+
+# Spatial neighbors for clustering (fixed layout, so computed once)
+NEIGHBORS = dists <= NEIGH_RADIUS_PX
 
 # ========= Pygame =========
+# Offline render: frames go to the MP4, so draw into a plain offscreen surface;
+# the dummy driver only keeps pg.init() happy on headless machines
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
 pg.init()
-screen = pg.display.set_mode((W, H))
-pg.display.set_caption("Metronomes — 45s, late lock ~40s, no audio")
+screen = pg.Surface((W, H))
 # Fonts (fallback to default if not present)
 font  = pg.font.SysFont("Avenir Next, Montserrat, Inter, Helvetica, Arial", 28)
 font2 = pg.font.SysFont("Avenir Next, Montserrat, Inter, Helvetica, Arial", 22)
 font_title = pg.font.SysFont("Avenir Next, Montserrat, Inter, Helvetica, Arial", 36)
 
 # ========= Style helpers =========
-def draw_vertical_gradient(surf, top_color, bottom_color):
-    w, h = surf.get_size()
-    for y in range(h):
-        t = y / max(1, h-1)
-        c = [int(top_color[i]*(1-t) + bottom_color[i]*t) for i in range(3)]
-        pg.draw.line(surf, c, (0, y), (w, y))
-
-def draw_vignette(surf, strength=110):
-    w, h = surf.get_size()
+def make_vertical_gradient(w, h, top_color, bottom_color):
+    # one 1×h column of interpolated colors, stretched to full width
+    t = (np.arange(h) / max(1, h-1)).reshape(-1, 1)
+    col = (np.array(top_color)*(1-t) + np.array(bottom_color)*t).astype(int)
+    column = pg.Surface((1, h))
+    pg.surfarray.blit_array(column, col.reshape(1, h, 3))
+    return pg.transform.scale(column, (w, h))
+
+def make_vignette(w, h, strength=110):
+    # alpha grows with squared distance from the centre; built once, subtracted per frame
     vign = pg.Surface((w, h), pg.SRCALPHA)
     cx, cy = w/2, h/2
     max_r2 = (cx**2 + cy**2)
+    xx = np.arange(w).reshape(-1, 1); yy = np.arange(h).reshape(1, -1)
+    alpha = strength * ((xx - cx)**2 + (yy - cy)**2) / max_r2
     arr = pg.surfarray.pixels_alpha(vign)
-    for y in range(h):
-        dy2 = (y - cy)**2
-        for x in range(w):
-            a = int(strength * ((x - cx)**2 + dy2) / max_r2)
-            if a > 0:
-                arr[x, y] = min(255, a)
+    arr[:] = np.minimum(alpha, 255).astype(np.uint8)  # surfarray is W×H
     del arr
-    surf.blit(vign, (0,0), special_flags=pg.BLEND_RGBA_SUB)
+    return vign
 
 def aa_line(surface, color, p1, p2, width=1):
     # Correct AA line using pygame.draw.aaline
@@ -201,69 +231,124 @@ def circle_soft(surface, center, radius, color, outline=0):
     if outline:
         gfx.aacircle(surface, x, y, radius+outline, color)
 
+@lru_cache(maxsize=4096)
+def render_text(font, text, color=TXT):
+    # typewriter captions show the same prefix for several frames in a row
+    return font.render(text, True, color)
+
+# One screen-sized alpha surface for every translucent box; the typewriter
+# captions grow a little each frame, so per-size surfaces never get reused.
+BOX_SCRATCH = pg.Surface((W, H), pg.SRCALPHA)
+
+def blit_box(surface, rect, box_rgba):
+    # fill() on an alpha surface overwrites the pixels, no clear needed
+    area = pg.Rect(0, 0, rect[2], rect[3])
+    BOX_SCRATCH.fill(box_rgba, area)
+    surface.blit(BOX_SCRATCH, rect[:2], area)
+
+def blit_sprites(surface, seq):
+    # pygame-ce's fblits skips building the dirty-rect list; plain pygame falls back to blits
+    if hasattr(surface, "fblits"):
+        surface.fblits(seq)
+    else:
+        surface.blits(seq, doreturn=0)
+
+BOB_RADIUS = 8
+
+@lru_cache(maxsize=None)
+def bob_sprite(color, outline=0):
+    # One antialiased bob per (color, outline), blitted centred on the bob position.
+    # gfxdraw's AA doesn't composite on alpha surfaces, so draw it over black and
+    # white and recover coverage (alpha) and color from the two results.
+    half = BOB_RADIUS + outline + 2
+    size = (2*half + 1, 2*half + 1)
+    on_black = pg.Surface(size)
+    on_white = pg.Surface(size); on_white.fill((255, 255, 255))
+    for surf in (on_black, on_white):
+        circle_soft(surf, (half, half), BOB_RADIUS, color, outline=outline)
+    b = pg.surfarray.array3d(on_black).astype(float)
+    w = pg.surfarray.array3d(on_white).astype(float)
+    alpha = 255 - (w - b).mean(axis=2)
+    rgb = b * 255 / np.maximum(alpha, 1)[..., None]
+    s = pg.Surface(size, pg.SRCALPHA)
+    pg.surfarray.pixels3d(s)[:] = np.clip(np.rint(rgb), 0, 255).astype(np.uint8)
+    pg.surfarray.pixels_alpha(s)[:] = np.clip(np.rint(alpha), 0, 255).astype(np.uint8)
+    return s, half
+
 def caption_box(surface, font, text, box_rgba, y_offset=32, pad=14):
-    msg = font.render(text, True, TXT)
+    msg = render_text(font, text)
     box_w = msg.get_width() + 2*pad
     box_h = msg.get_height() + 2*pad
     x = (W - box_w)//2
     y = H - box_h - y_offset
-    s = pg.Surface((box_w, box_h), pg.SRCALPHA)
-    s.fill(box_rgba)
-    surface.blit(s, (x, y))
+    blit_box(surface, (x, y, box_w, box_h), box_rgba)
     surface.blit(msg, (x+pad, y+pad))
 
 # ========= Kuramoto dynamics =========
 def smoothstep(z):
-    z = max(0.0, min(1.0, z))
+    z = np.clip(z, 0.0, 1.0)
     return z*z*(3 - 2*z)
 
 def K_eff_at(t):
-    if t <= T_RAMP_START:
-        return K_START
+    # scalar or array t; before the ramp z clips to 0, so K stays at K_START
     z = (t - T_RAMP_START) / max(1e-9, (T_LOCK_TARGET - T_RAMP_START))
     s = smoothstep(z)
     return K_START + s*(K_END - K_START)
 
-def step(theta, t, dt):
-    # staggered activation with fade-in
-    active = (t >= t_start)
-    gain = np.zeros_like(theta, float)
-    if np.any(active):
-        dt_since = np.clip(t - t_start[active], 0.0, FADEIN_SEC)
-        gain_active = np.clip(dt_since / FADEIN_SEC, 0.0, 1.0)
-        gain[active] = gain_active
-    G = np.outer(gain, gain)
-
-    dtheta = theta.reshape(-1,1) - theta.reshape(1,-1)
-    K_eff = K_eff_at(t)
-    coupling = K_eff * np.sum(Wnorm * G * np.sin(-dtheta), axis=1)
-
-    # tiny phase diffusion
-    eta = NOISE_STD * math.sqrt(dt) * rng.standard_normal(size=theta.shape)
-
-    return theta + (omega + coupling) * dt + eta
+# coupling for every substep of the render, by frame; substep k starts at t = k*DT
+K_TABLE = K_eff_at(np.arange(TOTAL_FRAMES * SUBSTEPS) * DT).reshape(TOTAL_FRAMES, SUBSTEPS)
+
+# clock at every substep boundary, summed DT by DT (cumsum is sequential), so it
+# matches the running t the loop used to keep
+T_SUB = np.concatenate(([0.0], np.cumsum(np.full(TOTAL_FRAMES * SUBSTEPS, DT))))
+
+# staggered activation with fade-in, for every substep: 0 before t_start, then a
+# FADEIN_SEC ramp up to 1
+GAIN_TABLE = np.clip((T_SUB[:-1, None] - t_start[None, :]) / FADEIN_SEC, 0.0, 1.0)
+GAIN_TABLE = GAIN_TABLE.reshape(TOTAL_FRAMES, SUBSTEPS, N)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _advance_frame(theta, omega, Wnorm, K_steps, gain_steps, dt, noise_block, sc):
+    # all of a frame's substeps in one call; theta is advanced in place.
+    # sc (n, 2) is caller-owned scratch, overwritten every substep: g·sin θ and
+    # g·cos θ side by side, one stream per row pass
+    n = theta.shape[0]
+    for s in range(K_steps.shape[0]):
+        K_eff = K_steps[s]
+        gain = gain_steps[s]
+        eta = noise_block[s]  # tiny phase diffusion, pre-scaled by NOISE_SCALE
+
+        for i in range(n):
+            sc[i, 0] = gain[i] * math.sin(theta[i])
+            sc[i, 1] = gain[i] * math.cos(theta[i])
+
+        # sum_j W_ij g_i g_j sin(θj-θi) factors into two mat-vecs:
+        #   g_i (cos θi · S_i - sin θi · C_i),  S = W @ (g sin θ), C = W @ (g cos θ)
+        # both come out of a single pass over each row of W.
+        # rows are independent → parallel over i, inner j loop stays serial;
+        # row i only reads theta[i] after sc is built, so it can be updated in place
+        for i in prange(n):
+            S = 0.0; C = 0.0
+            for j in range(n):
+                w = Wnorm[i, j]
+                S += w * sc[j, 0]
+                C += w * sc[j, 1]
+            coupling = K_eff * gain[i] * (math.cos(theta[i]) * S - math.sin(theta[i]) * C)
+            theta[i] = theta[i] + (omega[i] + coupling) * dt + eta[i]
+
+_sc = np.empty((N, 2))
+
+def advance_frame(theta, frame_idx):
+    # runs frame frame_idx's SUBSTEPS on theta in place; returns the time after them
+    _advance_frame(theta, omega, Wnorm, K_TABLE[frame_idx], GAIN_TABLE[frame_idx], DT,
+                   noise[frame_idx], _sc)
+    return float(T_SUB[(frame_idx + 1) * SUBSTEPS])
+
+# compile (or load from cache) now with the render loop's argument types, so the
+# first frame isn't charged for it; works on a copy, the real state is untouched
+advance_frame(theta.copy(), 0)
 
 # ========= Spatial + phase clustering =========
-class DSU:
-    def __init__(self, n):
-        self.p = list(range(n))
-        self.r = [0]*n
-    def find(self, x):
-        while self.p[x] != x:
-            self.p[x] = self.p[self.p[x]]
-            x = self.p[x]
-        return x
-    def union(self, a, b):
-        ra, rb = self.find(a), self.find(b)
-        if ra == rb: return
-        if self.r[ra] < self.r[rb]:
-            self.p[ra] = rb
-        elif self.r[ra] > self.r[rb]:
-            self.p[rb] = ra
-        else:
-            self.p[rb] = ra
-            self.r[ra] += 1
-
 def phase_diff(a, b):
     """smallest signed phase difference a-b in [-pi, pi]."""
     return (a - b + math.pi) % (2*math.pi) - math.pi
@@ -278,33 +363,20 @@ def spatial_phase_clusters(active_idxs, theta):
     m = len(active_idxs)
     if m == 0:
         return []
-    xi = xs[active_idxs]
-    yi = ys[active_idxs]
     th = theta[active_idxs]
-    dsu = DSU(m)
-    R2  = NEIGH_RADIUS_PX * NEIGH_RADIUS_PX
-    for i in range(m):
-        xi_i, yi_i, th_i = xi[i], yi[i], th[i]
-        for j in range(i+1, m):
-            dx = xi_i - xi[j]
-            dy = yi_i - yi[j]
-            if dx*dx + dy*dy <= R2:
-                if abs(phase_diff(th_i, th[j])) <= PHASE_THRESH_RAD:
-                    dsu.union(i, j)
-    comp = {}
-    for i in range(m):
-        r = dsu.find(i)
-        comp.setdefault(r, []).append(i)
-    clusters = [[int(active_idxs[i]) for i in local] for local in comp.values()]
+    aligned = np.abs(phase_diff(th.reshape(-1,1), th.reshape(1,-1))) <= PHASE_THRESH_RAD
+    adj = NEIGHBORS[np.ix_(active_idxs, active_idxs)] & aligned
+    n_comp, labels = connected_components(csr_matrix(adj), directed=False)
+    # components are labelled in order of their lowest member, like the old DSU scan
+    clusters = [[int(i) for i in active_idxs[labels == k]] for k in range(n_comp)]
     return clusters
 
-def cluster_coherence(theta, idxs):
+def cluster_coherence(sin_t, cos_t, idxs):
     """Circular order parameter r for a cluster (0..1)."""
     if not idxs:
         return 0.0
-    ang = theta[idxs]
-    re = float(np.mean(np.cos(ang)))
-    im = float(np.mean(np.sin(ang)))
+    re = float(np.mean(cos_t[idxs]))
+    im = float(np.mean(sin_t[idxs]))
     return math.hypot(re, im)
 
 # ========= State (hysteresis + lock hold) =========
@@ -312,57 +384,44 @@ color_state = {}   # i -> (rgb_tuple, ttl_seconds)
 lock_timer  = 0.0  # accumulates time with r >= R_LOCK
 
 # ========= Drawing (active-only spatial+phase clusters + hysteresis) =========
-def draw_metronomes(theta, t):
-    global lock_timer, color_state
+def draw_metronomes(sin_t, cos_t, clusters, fully_locked):
+    """clusters: spatial+phase clusters among ACTIVE metronomes (global indices)."""
+    global color_state
 
     frame_dt = SUBSTEPS * DT
 
-    # global order
-    re = float(np.mean(np.cos(theta))); im = float(np.mean(np.sin(theta)))
-    r  = math.hypot(re, im)
-
-    # lock hold logic
-    lock_timer = lock_timer + frame_dt if r >= R_LOCK else 0.0
-    fully_locked = (lock_timer >= LOCK_HOLD_SEC)
+    # bob positions for every rod (weight swings ABOVE base)
+    swing = ALPHA_MAX * sin_t
+    xb_i = (xs + A_PIX * np.sin(swing)).astype(np.int32)  # horizontal displacement
+    yb_i = (ys - A_PIX * np.cos(swing)).astype(np.int32)
+    bobs = list(zip(xb_i.tolist(), yb_i.tolist()))
 
     if fully_locked:
         # all green (with subtle outline)
-        for i in range(N):
-            x = xs[i]; y_base = ys[i]  # fixed base at bottom
-            aa_line(screen, PIN, (x, y_base-6), (x, y_base+6), 2)
-            ang   = ALPHA_MAX * math.sin(float(theta[i]))
-            x_bob = x + A_PIX * math.sin(ang)  # horizontal displacement
-            y_bob = y_base - A_PIX * math.cos(ang)  # weight swings ABOVE base
-            aa_line(screen, HASTE, (x, y_base), (x_bob, y_bob), 3)
-            circle_soft(screen, (int(x_bob), int(y_bob)), 8, LOCK_COLOR, outline=1)
+        sprite, half = bob_sprite(LOCK_COLOR, 1)
+        for base, bob in zip(BASES, bobs):
+            aa_line(screen, HASTE, base, bob, 3)
+        blit_sprites(screen, [(sprite, (x - half, y - half)) for x, y in bobs])
         color_state.clear()
         return
 
-    # --- Only ACTIVE metronomes take part in clustering ---
-    active_mask = (t >= t_start)
-    active_idxs = np.nonzero(active_mask)[0]
+    # qualify clusters by size & internal coherence
+    qualified = []
+    for cl in clusters:
+        if len(cl) >= MIN_CLUSTER_SIZE and cluster_coherence(sin_t, cos_t, cl) >= R_CLUSTER:
+            qualified.append(cl)
 
+    # assign pastel colors (cycle if needed)
     fresh_assign = {}
-    if len(active_idxs) > 0:
-        # spatial + phase clusters among ACTIVE ones
-        clusters_global = spatial_phase_clusters(active_idxs, theta)
-
-        # qualify clusters by size & internal coherence
-        qualified = []
-        for cl in clusters_global:
-            if len(cl) >= MIN_CLUSTER_SIZE and cluster_coherence(theta, cl) >= R_CLUSTER:
-                qualified.append(cl)
-
-        # assign pastel colors (cycle if needed)
-        color_iter = iter(CLUSTER_COLORS)
-        for cl in qualified:
-            try:
-                col = next(color_iter)
-            except StopIteration:
-                color_iter = iter(CLUSTER_COLORS)
-                col = next(color_iter)
-            for i in cl:
-                fresh_assign[i] = col
+    color_iter = iter(CLUSTER_COLORS)
+    for cl in qualified:
+        try:
+            col = next(color_iter)
+        except StopIteration:
+            color_iter = iter(CLUSTER_COLORS)
+            col = next(color_iter)
+        for i in cl:
+            fresh_assign[i] = col
 
     # hysteresis update (preserve colors briefly)
     new_state = {}
@@ -379,17 +438,17 @@ def draw_metronomes(theta, t):
     color_state = new_state
 
     # draw all metronomes (colored if in state, else neutral)
-    for i in range(N):
-        x = xs[i]; y_base = ys[i]  # fixed base at bottom
-        aa_line(screen, PIN, (x, y_base-6), (x, y_base+6), 2)
-        ang   = ALPHA_MAX * math.sin(float(theta[i]))
-        x_bob = x + A_PIX * math.sin(ang)  # horizontal displacement
-        y_bob = y_base - A_PIX * math.cos(ang)  # weight swings ABOVE base
-        aa_line(screen, HASTE, (x, y_base), (x_bob, y_bob), 3)
+    # rods first, then every bob in one batched blit (bobs never overlap a neighbor's rod)
+    blit_list = []
+    for i, (base, bob) in enumerate(zip(BASES, bobs)):
+        aa_line(screen, HASTE, base, bob, 3)
         col = color_state.get(i, (NEUTRAL_COLOR, 0.0))[0]
         outline_px = 1 if col != NEUTRAL_COLOR else 0
-        circle_soft(screen, (int(x_bob), int(y_bob)), 8, col, outline=outline_px)
+        sprite, half = bob_sprite(col, outline_px)
+        blit_list.append((sprite, (bob[0] - half, bob[1] - half)))
+    blit_sprites(screen, blit_list)
 
+@lru_cache(maxsize=64)
 def wrap_text(font, text, max_width):
     words = text.split(' ')
     lines, cur = [], ""
@@ -403,7 +462,7 @@ def wrap_text(font, text, max_width):
             cur = w
     if cur:
         lines.append(cur)
-    return lines
+    return tuple(lines)
 
 def caption_box_wrapped(surface, font, full_text, chars_to_show,
                         box_rgba, y_offset=32, pad=14, max_frac=0.86, line_gap=6):
@@ -428,34 +487,42 @@ def caption_box_wrapped(surface, font, full_text, chars_to_show,
         return  # nothing to draw yet
 
     # 3) Render lines and draw box
-    line_surfs = [font.render(ln, True, TXT) for ln in shown_lines]
+    line_surfs = [render_text(font, ln) for ln in shown_lines]
     box_w = min(max_w, max(ls.get_width() for ls in line_surfs) + 2*pad)
     box_h = sum(ls.get_height() for ls in line_surfs) + (len(line_surfs)-1)*line_gap + 2*pad
 
     x = (W - box_w)//2
     y = H - box_h - y_offset
-    s = pg.Surface((box_w, box_h), pg.SRCALPHA)
-    s.fill(box_rgba)
-    surface.blit(s, (x, y))
+    blit_box(surface, (x, y, box_w, box_h), box_rgba)
 
     cy = y + pad
     for ls in line_surfs:
         surface.blit(ls, (x + (box_w - ls.get_width())//2, cy))
         cy += ls.get_height() + line_gap
 
-def render_caption(t):
+def caption_at(t):
+    """(text, chars typed so far) of the caption showing at time t, or None."""
     for t_in, t_out, text in NARRA:
         if t_in <= t <= t_out:
             chars = int((t - t_in) * TYPE_CPS)
-            chars = max(0, min(len(text), chars))
-            caption_box_wrapped(screen, font, text, chars, CAPTION_BOX_RGBA,
-                                y_offset=40, pad=14, max_frac=0.86, line_gap=6)
-            break
+            return text, max(0, min(len(text), chars))
+    return None
+
+# the typewriter state only depends on the frame, so work it out once for the whole
+# render; captions are drawn at the time after each frame's physics
+CAPTION_BY_FRAME = [caption_at(T_SUB[(f + 1) * SUBSTEPS]) for f in range(TOTAL_FRAMES)]
+
+def render_caption(frame_idx):
+    caption = CAPTION_BY_FRAME[frame_idx]
+    if caption is not None:
+        text, chars = caption
+        caption_box_wrapped(screen, font, text, chars, CAPTION_BOX_RGBA,
+                            y_offset=40, pad=14, max_frac=0.86, line_gap=6)
 
 def draw_hud(theta, t):
     # Simple inspirational title instead of scientific metrics
     title = TITLES[LANG]
-    msg = font_title.render(title, True, TXT)  # White color and larger font
+    msg = render_text(font_title, title)  # White color and larger font
     # Center the title horizontally
     x = (W - msg.get_width()) // 2
     screen.blit(msg, (x, 18))  # Slightly higher position
@@ -471,48 +538,107 @@ def draw_credits(t):
         "Public on GitHub: https://github.com/rafaelvleite/kuramoto_metronomes"
     ]
     pad = 10; spacing = 6
-    msgs = [font2.render(s, True, TXT) for s in lines]
+    msgs = [render_text(font2, s) for s in lines]
     w = max(m.get_width() for m in msgs) + 2*pad
     h = sum(m.get_height() for m in msgs) + (len(msgs)-1)*spacing + 2*pad
     x = (W - w)//2; y = 76
-    box = pg.Surface((w, h), pg.SRCALPHA)
-    box.fill((0, 0, 0, 120))
-    screen.blit(box, (x, y))
+    blit_box(screen, (x, y, w, h), (0, 0, 0, 120))
     cy = y + pad
     for m in msgs:
         screen.blit(m, (x+pad, cy))
         cy += m.get_height() + spacing
 
+# Static background: gradient plus the pins, which never move
+BG_SURF = make_vertical_gradient(W, H, BG_TOP, BG_BOTTOM)
+for x, y_base in BASES:
+    aa_line(BG_SURF, PIN, (x, y_base-6), (x, y_base+6), 2)
+VIGNETTE = make_vignette(W, H, strength=110)
+
 # ========= Deterministic render-to-video (no audio) =========
-writer = imageio.get_writer(OUT_MP4, fps=VIDEO_FPS, codec="libx264", quality=8)
+# Frames go to ffmpeg in the screen's own pixel layout: grabbing the raw buffer is a
+# plain memcpy, while tobytes("RGB")/pixels3d have to swizzle every pixel. ffmpeg does
+# the conversion to yuv420p either way.
+_NATIVE_PIX_FMTS = {(0xFF0000, 0xFF00, 0xFF): "bgr0", (0xFF, 0xFF00, 0xFF0000): "rgb0"}
+FRAME_PIX_FMT = _NATIVE_PIX_FMTS.get(tuple(screen.get_masks()[:3]))
+if screen.get_bytesize() != 4 or screen.get_pitch() != 4*W:
+    FRAME_PIX_FMT = None
+
+# Frames cross to the writer thread in a ring of preallocated buffers. The writer
+# holds at most one frame plus a full queue, so with FRAME_QUEUE_DEPTH + 2 buffers
+# the one being filled has always been written out already.
+FRAME_QUEUE_DEPTH = 4  # render and encode overlap, a few frames apart
+FRAME_POOL = [np.empty((H, W, 4 if FRAME_PIX_FMT else 3), np.uint8)
+              for _ in range(FRAME_QUEUE_DEPTH + 2)]
+
+def grab_frame(buf):
+    if FRAME_PIX_FMT is None:
+        px = pg.surfarray.pixels3d(screen)
+        np.copyto(buf, px.swapaxes(0, 1))
+        del px  # releases the surface lock
+    else:
+        np.copyto(buf.reshape(-1), np.frombuffer(screen.get_buffer(), np.uint8))
+    return buf
+
+def encode_frames(frames, errors):
+    """Writer thread: feed queued frames to ffmpeg until the None sentinel."""
+    done = False
+    try:
+        writer = imageio_ffmpeg.write_frames(OUT_MP4, (W, H), fps=VIDEO_FPS, codec="libx264",
+                                             pix_fmt_in=FRAME_PIX_FMT or "rgb24",
+                                             quality=VIDEO_QUALITY, macro_block_size=1,
+                                             output_params=["-preset", VIDEO_PRESET])
+        writer.send(None)  # start ffmpeg
+        while (frame := frames.get()) is not None:
+            writer.send(frame)
+        done = True
+        writer.close()
+    except Exception as e:
+        errors.append(e)
+        while not done and frames.get() is not None:
+            pass  # keep draining so the render loop never blocks on a dead encoder
+
+frame_queue   = queue.Queue(maxsize=FRAME_QUEUE_DEPTH)
+writer_errors = []
+writer_thread = threading.Thread(target=encode_frames, args=(frame_queue, writer_errors), daemon=True)
+writer_thread.start()
 t = 0.0
 
-for frame_idx in range(TOTAL_FRAMES):
-    # minimal event pump (keeps window responsive)
-    for ev in pg.event.get():
-        if ev.type == pg.QUIT:
-            TOTAL_FRAMES = frame_idx + 1
-
-    # fixed-step physics
-    for _ in range(SUBSTEPS):
-        theta = step(theta, t, DT)
-        theta = (theta + math.pi) % (2*math.pi) - math.pi
-        t += DT
-
-    # background + scene
-    draw_vertical_gradient(screen, BG_TOP, BG_BOTTOM)
-    draw_metronomes(theta, t)
-    draw_hud(theta, t)
-    render_caption(t)
-    draw_vignette(screen, strength=110)  # subtle edge darkening
-
-    # capture
-    arr = pg.surfarray.array3d(pg.display.get_surface())  # WxHx3
-    frame = np.transpose(arr, (1, 0, 2))                  # HxWx3
-    writer.append_data(frame)
-
-    pg.display.flip()
-
-writer.close()
+try:
+    for frame_idx in range(TOTAL_FRAMES):
+        # fixed-step physics
+        t = advance_frame(theta, frame_idx)
+        # everything downstream is 2π-periodic, so wrapping only has to keep θ bounded
+        if (frame_idx & 31) == 0:
+            theta = np.remainder(theta + math.pi, 2*math.pi) - math.pi
+
+        # per-frame state shared by the drawing below
+        sin_t = np.sin(theta); cos_t = np.cos(theta)
+        re = float(np.mean(cos_t)); im = float(np.mean(sin_t))
+        r  = math.hypot(re, im)  # global order
+
+        # lock hold logic
+        lock_timer = lock_timer + SUBSTEPS * DT if r >= R_LOCK else 0.0
+        fully_locked = (lock_timer >= LOCK_HOLD_SEC)
+
+        # --- Only ACTIVE metronomes take part in clustering (skipped once locked) ---
+        clusters = [] if fully_locked else spatial_phase_clusters(np.nonzero(t >= t_start)[0], theta)
+
+        # background + scene
+        screen.blit(BG_SURF, (0,0))
+        draw_metronomes(sin_t, cos_t, clusters, fully_locked)
+        draw_hud(theta, t)
+        render_caption(frame_idx)
+        screen.blit(VIGNETTE, (0,0), special_flags=pg.BLEND_RGBA_SUB)  # subtle edge darkening
+
+        # capture into the next pool buffer and hand it to the writer thread
+        frame_queue.put(grab_frame(FRAME_POOL[frame_idx % len(FRAME_POOL)]))
+except KeyboardInterrupt:
+    # stop early but still close the writer, so the frames so far make a valid MP4
+    print(f"\n⏹️  Interrupted at frame {frame_idx}/{TOTAL_FRAMES}, finishing the video")
+
+frame_queue.put(None)
+writer_thread.join()
 pg.quit()
+if writer_errors:
+    raise writer_errors[0]
 print(f"✅ Saved MP4 (no audio): {OUT_MP4}")